@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # Charts are only rendered to PNG bytes, never to a window
 import matplotlib.pyplot as plt
 import numpy as np
-import plotly.graph_objs as go
-from scipy.interpolate import make_interp_spline
 import warnings
+import os
+import io
+import tempfile
+from collections import namedtuple
 from datetime import datetime
 
 # Configure Streamlit page
@@ -20,100 +24,150 @@ It includes cumulative balance analysis, net profit per symbol, best trading ses
 """)
 
 # Load and preprocess data
-file_path = 'FTMO.CSV.REAL.csv'
-df = pd.read_csv(file_path)
-df['Open'] = pd.to_datetime(df['Open'], format='%d/%m/%Y %H:%M')
-df['Close'] = pd.to_datetime(df['Close'], format='%d/%m/%Y %H:%M')
-df['Trade duration in minutes'] = df['Trade duration in seconds'] / 60
-df.drop(['Trade duration in seconds'], axis=1, inplace=True)
-df.sort_values(by='Close', inplace=True)
-
-# Define the trading session function and create the Trading Session column
-def get_trading_session(hour):
-    if 12 <= hour < 17:
-        return 'New York Session'
-    elif 7 <= hour < 10:
-        return 'London Session'
-    else:
-        return 'Out of Session'
-
-df['Trading Session'] = df['Close'].dt.hour.apply(get_trading_session)
-
-# Perform the grouping operations after the column is created
-net_profit_per_symbol = df.groupby('Symbol')['Profit'].sum().sort_values()
-session_performance = df.groupby('Trading Session')['Profit'].sum().sort_values(ascending=False)
-
-# Calculate cumulative balance
-initial_balance = 25000
-df['Cumulative Profit'] = df['Profit'].cumsum()
-df['Balance'] = initial_balance + df['Cumulative Profit']
-
-# Interpolation for smoothing the balance line
-x = np.arange(len(df))
-y = df['Balance'].values
-x_smooth = np.linspace(x.min(), x.max(), 10000)
-spl = make_interp_spline(x, y, k=3)
-y_smooth = spl(x_smooth)
-
-# Calculate total P&L
-total_pnl = df['Profit'].sum()
-
-# Key metrics
-total_trades = len(df)
-most_traded_instrument = df['Symbol'].mode()[0]
-most_traded_day = df['Close'].dt.day_name().mode()[0]
-
-# Calculate win rate
-winning_trades = df[df['Profit'] > 0]
-win_rate = len(winning_trades) / total_trades * 100 if not winning_trades.empty else None
-
-# Calculate Risk-Reward (RR) Ratio using Average Profit and Average Loss
-average_profit = df[df['Profit'] > 0]['Profit'].mean()
-average_loss = df[df['Profit'] < 0]['Profit'].mean()
-rr_ratio_avg = abs(average_profit / average_loss) if average_loss != 0 else None
-
-# Calculate percentage growth
-percentage_growth = (df['Balance'].iloc[-1] - initial_balance) / initial_balance * 100
-
-# Calculate additional key metrics
-max_drawdown = df['Balance'].min() - initial_balance
-average_trade_duration = df['Trade duration in minutes'].mean()
-average_win = df[df['Profit'] > 0]['Profit'].mean()
-average_loss = df[df['Profit'] < 0]['Profit'].mean()
-
-# Calculate the profit/loss for trades out of session
-out_of_session_trades = df[df['Trading Session'] == 'Out of Session']
-out_of_session_loss = out_of_session_trades['Profit'].sum()
-
-
-# Display the key metrics in a more compact manner
-st.markdown("### Key Metrics")
-col1, col2, col3, col4, col5, col6 = st.columns(6)
-col1.metric(label="Total P&L", value=f"+ £{total_pnl:,.2f}")
-col2.metric(label="Trades", value=f"{total_trades}")
-col3.metric(label="Account Growth", value=f"+{percentage_growth:.2f}%")
-if rr_ratio_avg is not None:
-    col4.metric(label="Average RRR", value=f"{rr_ratio_avg:.2f}")
-if win_rate is not None:
-    col5.metric(label="Win Rate", value=f"{win_rate:.2f}%")
-col6.metric(label="Most Traded Day", value=f"{most_traded_day}")
-
-main_col, side_col = st.columns([2, 1])
-
-with main_col:
-    # Cumulative balance plot
-    st.subheader("Account Balance Growth")
+# The parsed trades are kept in a Parquet copy next to the CSV so reruns skip CSV parsing.
+# Bump TRADES_CACHE_VERSION whenever load_trades changes the columns or dtypes it returns,
+# so copies written by an older loader are never read back.
+TRADES_CACHE_VERSION = 2
+
+@st.cache_data
+def load_trades(path, mtime):
+    parquet_path = f'{path}.v{TRADES_CACHE_VERSION}.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        try:
+            return pd.read_parquet(parquet_path, engine='pyarrow')
+        except (OSError, ValueError):
+            pass  # A damaged copy is simply rebuilt from the CSV below
+
+    df = pd.read_csv(path, engine='pyarrow', usecols=['Open', 'Close', 'Profit', 'Symbol', 'Trade duration in seconds'],
+                     dtype={'Symbol': 'category', 'Profit': 'float32'}, parse_dates=['Open', 'Close'], date_format='%d/%m/%Y %H:%M')
+    df['Trade duration in minutes'] = df['Trade duration in seconds'] / 60
+    df.drop(['Trade duration in seconds'], axis=1, inplace=True)
+    # Write to a temporary file and move it into place so concurrent runs never read a half-written copy
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path) or '.', suffix='.parquet.tmp')
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, engine='pyarrow')
+            os.replace(tmp_path, parquet_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    except OSError:
+        pass  # Read-only deployments simply fall back to parsing the CSV
+    return df
+
+# Day names in the order of Series.dt.dayofweek (Monday=0)
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Define the trading sessions used to tag each trade
+TRADING_SESSIONS = ['New York Session', 'London Session', 'Out of Session']
+
+def get_trading_session(hours):
+    session_codes = np.select([(hours >= 12) & (hours < 17), (hours >= 7) & (hours < 10)], [0, 1], default=2)
+    return pd.Categorical.from_codes(session_codes, categories=TRADING_SESSIONS)
+
+# Summarise the profit column: the balance curve plus every scalar the metrics are built from
+def summarize(profit, session_codes, initial_balance):
+    # Profit is stored as float32, but the running balance is accumulated in float64 so rounding doesn't add up
+    balance = initial_balance + profit.cumsum(dtype=np.float64)
+    # Max drawdown is the deepest fall from a running peak, counting the starting balance as the first peak
+    peak = np.maximum(np.maximum.accumulate(balance), initial_balance)
+    max_drawdown = (balance - peak).min()
+
+    winning = profit > 0
+    losing = profit < 0
+    winning_count = winning.sum()
+    losing_count = losing.sum()
+    winning_sum = profit[winning].sum(dtype=np.float64)
+    losing_sum = profit[losing].sum(dtype=np.float64)
+    session_totals = np.bincount(session_codes, weights=profit, minlength=len(TRADING_SESSIONS))
+
+    return balance, max_drawdown, winning_count, winning_sum, losing_count, losing_sum, session_totals
+
+# Everything below only depends on the CSV, so the whole preparation is cached
+# and widget reruns go straight to the plotting code
+Prepared = namedtuple('Prepared', ['df', 'net_profit_per_symbol', 'session_performance', 'balance', 'metrics'])
+
+@st.cache_data
+def prepare(path, mtime, initial_balance):
+    df = load_trades(path, mtime)
+    # Exports are usually already in closing order, so only sort when they are not
+    close = df['Close'].to_numpy()
+    if not (close[1:] >= close[:-1]).all():
+        df.sort_values(by='Close', inplace=True, kind='stable')
+    df['Trading Session'] = get_trading_session(df['Close'].dt.hour.to_numpy())
+
+    # Perform the grouping operations after the column is created
+    net_profit_per_symbol = df.groupby('Symbol', observed=True, sort=False)['Profit'].sum().sort_values()
+
+    # Calculate cumulative balance and the per-trade and per-session totals in one place
+    (balance, max_drawdown, winning_count, winning_sum, losing_count, losing_sum,
+     session_totals) = summarize(df['Profit'].to_numpy(), df['Trading Session'].cat.codes.to_numpy(), initial_balance)
+    session_performance = pd.Series(session_totals, index=TRADING_SESSIONS).sort_values(ascending=False)
+    out_of_session_loss = session_totals[TRADING_SESSIONS.index('Out of Session')]
+
+    # Calculate total P&L
+    total_pnl = balance[-1] - initial_balance
+
+    # Key metrics
+    total_trades = len(df)
+    most_traded_instrument = df['Symbol'].value_counts().index[0]
+    most_traded_day = DAYS_OF_WEEK[np.bincount(df['Close'].dt.dayofweek.to_numpy(), minlength=7).argmax()]
+
+    # Average win and loss
+    average_win = winning_sum / winning_count if winning_count else np.nan
+    average_loss = losing_sum / losing_count if losing_count else np.nan
+
+    # Calculate win rate
+    win_rate = winning_count / total_trades * 100 if winning_count else None
+
+    # Calculate Risk-Reward (RR) Ratio using Average Win and Average Loss
+    rr_ratio_avg = abs(average_win / average_loss) if winning_count and losing_count else None
+
+    # Calculate percentage growth
+    percentage_growth = total_pnl / initial_balance * 100
+
+    # Calculate additional key metrics
+    average_trade_duration = df['Trade duration in minutes'].mean()
+
+    metrics = {
+        'total_pnl': total_pnl,
+        'total_trades': total_trades,
+        'most_traded_instrument': most_traded_instrument,
+        'most_traded_day': most_traded_day,
+        'win_rate': win_rate,
+        'rr_ratio_avg': rr_ratio_avg,
+        'percentage_growth': percentage_growth,
+        'max_drawdown': max_drawdown,
+        'average_trade_duration': average_trade_duration,
+        'average_win': average_win,
+        'average_loss': average_loss,
+        'out_of_session_loss': out_of_session_loss,
+    }
+    return Prepared(df, net_profit_per_symbol, session_performance, balance, metrics)
+
+# Charts are rendered to PNG bytes once and cached, so reruns only send the image
+def fig_to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+@st.cache_data
+def balance_png(balance, initial_balance):
+    x = np.arange(len(balance))
     fig, ax = plt.subplots(figsize=(8, 4))
-    ax.plot(x_smooth, y_smooth, color='teal')
+    ax.plot(x, balance, color='teal', linewidth=1.2, antialiased=True)
     ax.axhline(y=initial_balance, color='gray', linestyle='--')
     ax.set_xlabel('Number of trades')
     ax.set_ylabel('Balance')
     ax.set_title('Cumulative Balance')
     ax.set_xlim(x.min(), x.max())
     ax.grid(False)
-    st.pyplot(fig)
+    return fig_to_png(fig)
 
-    st.subheader("Trading Session Performance")
+@st.cache_data
+def session_performance_png(session_performance):
     # Define colors
     colors = ['green' if session in ['New York Session', 'London Session'] else 'red' for session in session_performance.index]
     fig, ax = plt.subplots(figsize=(5, 3))
@@ -121,45 +175,88 @@ with main_col:
     ax.set_ylabel('Net Profit')
     ax.set_xticklabels(session_performance.index, rotation=45, ha='right', fontsize=10)
     ax.grid(True, which='both', axis='y', linestyle='-')  # Only horizontal lines
-    st.pyplot(fig)
-    plt.show()
+    return fig_to_png(fig)
+
+@st.cache_data
+def trade_duration_histogram(trade_duration):
+    return np.histogram(trade_duration, bins=30)
+
+@st.cache_data
+def trade_duration_png(counts, edges):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color='skyblue', edgecolor='black')
+    ax.set_xlabel('Duration (minutes)')
+    ax.set_ylabel('Frequency')
+    ax.set_title('Trade Durations')
+    return fig_to_png(fig)
+
+@st.cache_data
+def net_profit_per_symbol_png(net_profit_per_symbol):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    net_profit_per_symbol.plot(kind='bar', ax=ax, color='skyblue')
+    ax.set_ylabel('Net Profit')
+    ax.set_xticklabels(net_profit_per_symbol.index, rotation=45, ha='right', fontsize=10)
+    ax.grid(True, which='both', axis='y', linestyle='-')  # Only horizontal lines
+    return fig_to_png(fig)
+
+file_path = 'FTMO.CSV.REAL.csv'
+initial_balance = 25000
+df, net_profit_per_symbol, session_performance, balance, metrics = prepare(file_path, os.path.getmtime(file_path), initial_balance)
+
+# Display the key metrics in a more compact manner
+st.markdown("### Key Metrics")
+col1, col2, col3, col4, col5, col6 = st.columns(6)
+col1.metric(label="Total P&L", value=f"+ £{metrics['total_pnl']:,.2f}")
+col2.metric(label="Trades", value=f"{metrics['total_trades']}")
+col3.metric(label="Account Growth", value=f"+{metrics['percentage_growth']:.2f}%")
+if metrics['rr_ratio_avg'] is not None:
+    col4.metric(label="Average RRR", value=f"{metrics['rr_ratio_avg']:.2f}")
+if metrics['win_rate'] is not None:
+    col5.metric(label="Win Rate", value=f"{metrics['win_rate']:.2f}%")
+col6.metric(label="Most Traded Day", value=f"{metrics['most_traded_day']}")
+
+main_col, side_col = st.columns([2, 1])
 
+with main_col:
+    # Cumulative balance plot
+    st.subheader("Account Balance Growth")
+    st.image(balance_png(balance, initial_balance))
 
-# Calculate the profit/loss for trades out of session
-out_of_session_trades = df[df['Trading Session'] == 'Out of Session']
-out_of_session_loss = out_of_session_trades['Profit'].sum()
+    st.subheader("Trading Session Performance")
+    st.image(session_performance_png(session_performance))
 
-# Identify the worst trading pair and session
-worst_trading_pair = net_profit_per_symbol.idxmin()
-worst_trading_pair_loss = net_profit_per_symbol.min()
-worst_trading_session = session_performance.idxmin()
-worst_trading_session_loss = session_performance.min()
+# Identify the best and worst trading pair and session
+# net_profit_per_symbol is sorted ascending and session_performance descending, so these are the end rows
+best_trading_pair, best_trading_pair_profit = net_profit_per_symbol.index[-1], net_profit_per_symbol.iloc[-1]
+worst_trading_pair, worst_trading_pair_loss = net_profit_per_symbol.index[0], net_profit_per_symbol.iloc[0]
+best_trading_session, best_trading_session_profit = session_performance.index[0], session_performance.iloc[0]
+worst_trading_session, worst_trading_session_loss = session_performance.index[-1], session_performance.iloc[-1]
 
 
 with side_col:
     st.subheader("Insights and Advice")
     st.markdown(f"""
-- **Best Trading Pair**: **{net_profit_per_symbol.idxmax()}** with a net profit of £{net_profit_per_symbol.max():,.2f}.
+- **Best Trading Pair**: **{best_trading_pair}** with a net profit of £{best_trading_pair_profit:,.2f}.
 - **Worst Trading Pair**: **{worst_trading_pair}** with a net loss of £{abs(worst_trading_pair_loss):,.2f}.
-- **Best Trading Session**: **{session_performance.idxmax()}** with a total profit of £{session_performance.max():,.2f}.
+- **Best Trading Session**: **{best_trading_session}** with a total profit of £{best_trading_session_profit:,.2f}.
 - **Worst Trading Session**: **{worst_trading_session}** with a total loss of £{abs(worst_trading_session_loss):,.2f}.
 - **Advice**:
-  - :chart_with_upwards_trend: **Focus on trading the {net_profit_per_symbol.idxmax()} pair** for highest returns.
+  - :chart_with_upwards_trend: **Focus on trading the {best_trading_pair} pair** for highest returns.
   - :mag_right: **Review and refine strategies** for pairs and sessions with lower performance.
   - :pound: Aim for at least **2 RR Ratio** and **50% win rate** to enhance profitability.
   - :clock1: **Consider only trading LDN and NY sessions** - trading out of session proves to be a hindrance to being profitable.
-  - :no_entry_sign: **If you stayed away from trading 'Out of Session', you would've prevented the loss of: £{out_of_session_loss:,.2f}.**
+  - :no_entry_sign: **If you stayed away from trading 'Out of Session', you would've prevented the loss of: £{metrics['out_of_session_loss']:,.2f}.**
 """)
     
 
 
     st.subheader("Other Key Metrics")
     st.markdown(f"""
-    - **Most Traded Pair**: **{most_traded_instrument}**
-    - **Average Trade Duration**: **{average_trade_duration:.2f} mins**
-    - **Max Drawdown**: **£{max_drawdown:,.2f}**
-    - **Average Win**: **£{average_win:.2f}**
-    - **Average Loss**: **£{average_loss:.2f}**
+    - **Most Traded Pair**: **{metrics['most_traded_instrument']}**
+    - **Average Trade Duration**: **{metrics['average_trade_duration']:.2f} mins**
+    - **Max Drawdown**: **£{metrics['max_drawdown']:,.2f}**
+    - **Average Win**: **£{metrics['average_win']:.2f}**
+    - **Average Loss**: **£{metrics['average_loss']:.2f}**
     """)
 
 # Additional analysis below the main chart
@@ -168,23 +265,11 @@ col7, col8 = st.columns(2)
 
 with col7:    
     st.subheader("Trade Duration Analysis")
-    trade_duration = df['Trade duration in minutes']
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.hist(trade_duration, bins=30, color='skyblue', edgecolor='black')
-    ax.set_xlabel('Duration (minutes)')
-    ax.set_ylabel('Frequency')
-    ax.set_title('Trade Durations')
-    st.pyplot(fig)
+    st.image(trade_duration_png(*trade_duration_histogram(df['Trade duration in minutes'].to_numpy())))
 
 with col8:
     st.subheader("Net Profit per Symbol")
-    fig, ax = plt.subplots(figsize=(6, 4))
-    net_profit_per_symbol.plot(kind='bar', ax=ax, color='skyblue')
-    ax.set_ylabel('Net Profit')
-    ax.set_xticklabels(net_profit_per_symbol.index, rotation=45, ha='right', fontsize=10)
-    ax.grid(True, which='both', axis='y', linestyle='-')  # Only horizontal lines
-    st.pyplot(fig)
-    plt.show()
+    st.image(net_profit_per_symbol_png(net_profit_per_symbol))
 
 # Summary and conclusion
 st.markdown("""